@@ -1,14 +1,82 @@
-from typing import ClassVar, Any, Callable, Self
-from hashlib import md5
+from typing import ClassVar, Any, Callable
+from collections import deque
+from copy import deepcopy
+from hashlib import md5, sha256
+from weakref import ref
 import pydantic
 from . import utils
 from . import report
 
+try:
+    from blake3 import blake3  # pyright: ignore[reportMissingImports]
+except ImportError:
+    blake3 = None
+
 
 def hash_md5_hex(value: bytes) -> str:
     return md5(value).hexdigest()
 
 
+def hash_sha256_hex(value: bytes) -> str:
+    return sha256(value).hexdigest()
+
+
+def hash_blake3_hex(value: bytes) -> str:
+    if blake3 is None:
+        raise ImportError(
+            "hash_blake3_hex requires the 'blake3' package. Install it with "
+            "`pip install pydantic-identity[blake3]`."
+        )
+    return blake3(value).hexdigest()
+
+
+# CLASS-LEVEL CACHE REGISTRIES ==========================================================
+# Always store class-level cached values in mappings keyed by class identity, instead of
+# standalone class variables, to prevent incorrect cache lookups when multiple
+# inheritance is used. Entries are keyed by `id(cls)` and hold a weak reference to the
+# class, so classes that are garbage collected (e.g. dynamically created models) don't
+# stay pinned in memory. Always check that the reference still points to the class
+# before using a cached value.
+# These are module-level, rather than class variables, because attribute lookups on
+# Pydantic model classes are slow, and these are read on every instance creation.
+
+_schema_hash_registry: dict[int, tuple[ref, str]] = {}
+"""Cached schema hashes for subclasses."""
+
+_schema_hash_input_registry: dict[int, tuple[ref, bytes]] = {}
+"""Cached schema hash input data for subclasses."""
+
+_schema_identity_report_registry: dict[int, tuple[ref, report.SchemaIdentityInfo]] = {}
+"""Cached schema identity reports for subclasses."""
+
+
+def _registry_get[T](cls: type, registry: dict[int, tuple[ref, T]]) -> T | None:
+    """Returns the class's cached value from a cache registry, or None if missing."""
+    try:
+        class_ref, value = registry[id(cls)]
+    except KeyError:
+        return None
+    if class_ref() is cls:
+        return value
+    return None
+
+
+def _registry_store[T](cls: type, registry: dict[int, tuple[ref, T]], value: T) -> T:
+    """
+    Stores a value for the class in a cache registry, unless one is already stored, and
+    returns the stored value, so concurrent first accesses all return the same value.
+    The entry is removed automatically when the class is garbage collected.
+    """
+    key = id(cls)
+    entry = (ref(cls, lambda _: registry.pop(key, None)), value)
+    stored = registry.setdefault(key, entry)
+    if stored is entry or stored[0]() is cls:
+        return stored[1]
+    # The stored entry belongs to a class that's already been garbage collected.
+    registry[key] = entry
+    return value
+
+
 class BaseIdentityModel(pydantic.BaseModel):
     """
     A BaseModel with the ability to hash its schema. Useful if storing densely nested
@@ -22,7 +90,8 @@ class BaseIdentityModel(pydantic.BaseModel):
     model, to capture the full schema identity.
 
     Performance: This is generally efficient, because the hash is only computed once per
-    model class (not instance), when the class's hash is first accessed.
+    model class (not instance), when the class's hash is first accessed, or when the class
+    is created, if eager hashing is enabled.
 
     CONFIGURABLE BEHAVIOR
     =====================
@@ -37,6 +106,7 @@ class BaseIdentityModel(pydantic.BaseModel):
     - How many path parts from the tail of your model's filename to track.
     - Hashing function
     - Whether to track the validation mode of the JSON schema
+    - Whether to compute the hash eagerly, when the class is created
     """
 
     # CLASS CONFIG ======================================================================
@@ -87,7 +157,10 @@ class BaseIdentityModel(pydantic.BaseModel):
     model_schema_hash_function: ClassVar[Callable[[bytes], str]] = hash_md5_hex
     """
     Class config: The hashing function to use for the schema hash. By default, MD5 is
-    used. It's plenty fast and collision-resistant for this use case.
+    used. It's plenty fast and collision-resistant for this use case. For very large
+    schemas, `hash_sha256_hex` is often faster on CPUs with SHA extensions, and
+    `hash_blake3_hex` is faster still, if the optional `blake3` package is installed.
+    WARNING: Changing the hashing function changes every hash.
     """
 
     model_schema_hash_track_validation_mode: ClassVar[bool] = True
@@ -102,6 +175,18 @@ class BaseIdentityModel(pydantic.BaseModel):
     issues, do not disable this.
     """
 
+    model_schema_hash_eager: ClassVar[bool] = False
+    """
+    Class config: Whether to compute the schema hash as soon as the class is created,
+    instead of when it's first accessed. This moves the one-time cost of computing the
+    hash to import time, so it doesn't land on the first request that uses the model.
+    Classes with unresolved forward references, or whose hash fails to generate (e.g. due
+    to `json_schema_mode_override`, or a field type with no JSON schema), are skipped, and
+    hashed lazily instead, so any error is raised when the hash is first accessed.
+    WARNING: Any class config changed after class creation won't be reflected in the hash
+    unless it's rebuilt.
+    """
+
     # INSTANCE METHODS ==================================================================
 
     @property
@@ -113,24 +198,41 @@ class BaseIdentityModel(pydantic.BaseModel):
 
     # CLASS METHODS =====================================================================
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        """Called by Pydantic after a subclass is fully built."""
+        super().__pydantic_init_subclass__(**kwargs)
+        if cls.model_schema_hash_eager and cls.__pydantic_complete__:
+            try:
+                cls.model_schema_hash_get()
+            except Exception:
+                # Don't fail class creation. The error is raised again if, and when, the
+                # hash is accessed, like it would be without eager hashing.
+                pass
+
     @classmethod
     def model_schema_hash_get(cls) -> str:
         """
         Returns the cached schema hash for the class, creating it if it doesn't exist.
         """
-        return cls._schema_hash_registry.get(
-            cls
-        ) or cls._schema_hash_registry.setdefault(
-            cls, cls.model_schema_hash_create_new()
-        )
+        # Same as `_registry_get()`, but inlined, since this runs on every instance creation
+        # of `BaseModelWithSchemaHash`, and the extra function call is measurable there.
+        try:
+            class_ref, schema_hash = _schema_hash_registry[id(cls)]
+            if class_ref() is cls:
+                return schema_hash
+        except KeyError:
+            pass
+        # Hash the cached input data, so both caches always describe the same hash.
+        hash_input_data = cls.model_schema_hash_get_input_data()
+        schema_hash = cls._create_hash_from_input_data(hash_input_data)
+        return _registry_store(cls, _schema_hash_registry, schema_hash)
 
     @classmethod
     def model_schema_hash_create_new(cls) -> str:
         """Creates a new schema hash for the class."""
-        hash_input_data = cls.model_schema_hash_get_input_data()
-        id_hash = cls.model_schema_hash_function(hash_input_data)
-        id_hash = id_hash[: cls.model_schema_hash_limit_length or 1000]
-        return id_hash
+        hash_input_data = cls.model_schema_hash_create_input_data()
+        return cls._create_hash_from_input_data(hash_input_data)
 
     @classmethod
     def model_schema_get_fullname(cls) -> str:
@@ -146,8 +248,19 @@ class BaseIdentityModel(pydantic.BaseModel):
     def model_schema_hash_get_input_data(cls) -> bytes:
         """
         Returns the exact value that was passed to the hashing function when creating the
-        schema hash. Useful for debugging. Returns a new JSON object as bytes. To inspect
-        the data, just `data.decode("utf-8")` and pass it to `json.loads()`.
+        schema hash. Useful for debugging. Returns a cached JSON object as bytes, creating
+        it if it doesn't exist. To inspect the data, just `data.decode("utf-8")` and pass
+        it to `json.loads()`.
+        """
+        if (input_data := _registry_get(cls, _schema_hash_input_registry)) is not None:
+            return input_data
+        input_data = cls.model_schema_hash_create_input_data()
+        return _registry_store(cls, _schema_hash_input_registry, input_data)
+
+    @classmethod
+    def model_schema_hash_create_input_data(cls) -> bytes:
+        """
+        Creates new input data for the hashing function, as a JSON object in bytes.
         """
         cls._validate_no_json_schema_mode_override()
 
@@ -157,10 +270,14 @@ class BaseIdentityModel(pydantic.BaseModel):
         track_field_order = cls.model_schema_hash_track_field_order
         track_type_order = cls.model_schema_hash_track_type_order
 
-        json_schemas = {
-            "ser_by_alias": cls.model_json_schema(mode="serialization", by_alias=True),
-            "ser_by_name": cls.model_json_schema(mode="serialization", by_alias=False),
-        }
+        ser_by_alias = cls.model_json_schema(mode="serialization", by_alias=True)
+        if utils.core_schema_has_aliases(cls.__pydantic_core_schema__):
+            ser_by_name = cls.model_json_schema(mode="serialization", by_alias=False)
+        else:
+            # Without any aliases, both schemas are identical, so skip generating it.
+            ser_by_name = deepcopy(ser_by_alias)
+
+        json_schemas = {"ser_by_alias": ser_by_alias, "ser_by_name": ser_by_name}
         if track_validation_mode:
             json_schemas["val_by_alias"] = cls.model_json_schema(
                 mode="validation", by_alias=True
@@ -190,8 +307,9 @@ class BaseIdentityModel(pydantic.BaseModel):
         Deletes and regenerates the schema hash for the class. This is only useful if you
         forcibly mutated the class in some way at runtime, that would change its schema.
         """
-        cls._schema_hash_registry.pop(cls, None)
-        cls._schema_identity_report_registry.pop(cls, None)
+        _schema_hash_registry.pop(id(cls), None)
+        _schema_hash_input_registry.pop(id(cls), None)
+        _schema_identity_report_registry.pop(id(cls), None)
         return cls.model_schema_hash_get()
 
     @classmethod
@@ -200,25 +318,32 @@ class BaseIdentityModel(pydantic.BaseModel):
         Returns identifying information about the model schema, its hash, class settings,
         datetime of the start of this process, etc.
         """
-        return cls._schema_identity_report_registry.get(
-            cls
-        ) or cls._schema_identity_report_registry.setdefault(
-            cls,
-            report.SchemaIdentityInfo(
-                fullname=cls.model_schema_get_fullname(),
-                hash=cls.model_schema_hash_get(),
-                hash_settings=report.SchemaIdentityInfoHashSettings(
-                    track_descriptions=cls.model_schema_hash_track_descriptions,
-                    track_field_order=cls.model_schema_hash_track_field_order,
-                    track_type_order=cls.model_schema_hash_track_type_order,
-                    tracked_filepath_parts=cls.model_schema_hash_tracked_filepath_parts,
-                    track_validation_mode=cls.model_schema_hash_track_validation_mode,
-                ),
+        if (
+            identity_report := _registry_get(cls, _schema_identity_report_registry)
+        ) is not None:
+            return identity_report
+        identity_report = report.SchemaIdentityInfo(
+            fullname=cls.model_schema_get_fullname(),
+            hash=cls.model_schema_hash_get(),
+            hash_settings=report.SchemaIdentityInfoHashSettings(
+                track_descriptions=cls.model_schema_hash_track_descriptions,
+                track_field_order=cls.model_schema_hash_track_field_order,
+                track_type_order=cls.model_schema_hash_track_type_order,
+                tracked_filepath_parts=cls.model_schema_hash_tracked_filepath_parts,
+                track_validation_mode=cls.model_schema_hash_track_validation_mode,
             ),
         )
+        return _registry_store(cls, _schema_identity_report_registry, identity_report)
 
     # HELPERS ===========================================================================
 
+    @classmethod
+    def _create_hash_from_input_data(cls, hash_input_data: bytes) -> str:
+        """Hashes the input data, and truncates the hash to the configured length."""
+        id_hash = cls.model_schema_hash_function(hash_input_data)
+        id_hash = id_hash[: cls.model_schema_hash_limit_length or 1000]
+        return id_hash
+
     @classmethod
     def _validate_no_json_schema_mode_override(cls) -> None:
         """
@@ -242,49 +367,50 @@ class BaseIdentityModel(pydantic.BaseModel):
     def _preprocess_schemas(
         cls, data: Any, sort_required: bool, del_descriptions: bool, sort_lists: bool
     ):
+        """
+        Normalizes the schemas in place, walking every dict node exactly once with an
+        explicit worklist instead of recursion.
+        Lists to be sorted are stringified, so they can only be sorted after everything
+        nested inside them has been processed. They're queued during the walk, and sorted
+        in reverse discovery order afterwards, so inner lists are always sorted first.
+        """
+        stack: deque[tuple[dict, bool]] = deque()
+        lists_to_sort: list[tuple[dict, str, list]] = []
+
         if isinstance(data, dict):
-            for k, v in list(data.items()):
+            stack.append((data, del_descriptions))
+
+        while stack:
+            node, del_desc = stack.pop()
+
+            # Description is the only key ever deleted, so delete it up front, and then
+            # iterate the dict directly instead of a copy of its items.
+            if del_desc is True and isinstance(node.get("description"), str):
+                del node["description"]
 
-                if (
-                    del_descriptions is True
-                    and k == "description"
-                    and isinstance(v, str)
-                ):
-                    del data[k]
-                    continue
+            for k, v in node.items():
 
-                if isinstance(v, list) and len(v) > 0:
+                if isinstance(v, dict):
+                    stack.append((v, del_desc))
+
+                elif isinstance(v, list) and len(v) > 0:
                     if (
                         sort_required is True
                         and k == "required"
                         and isinstance(v[0], str)
                     ):
-                        data[k] = list(sorted(v))
+                        v.sort()
                     elif sort_lists is True and k != "default":
-                        [
-                            cls._preprocess_schemas(x, sort_required, False, sort_lists)
-                            for x in v
-                        ]
-                        data[k] = list(sorted([str(x) for x in v]))
-
-                cls._preprocess_schemas(v, sort_required, del_descriptions, sort_lists)
-
-    # CLASS-LEVEL CACHE REGISTRIES ======================================================
-    # Always store class-level cached values in mappings keyed by class identity, instead
-    # of standalone class variables, to prevent incorrect cache lookups when multiple
-    # inheritance is used.
-
-    _schema_hash_registry: ClassVar[dict[type[Self], str]] = {}
-    """
-    Cached schema hashes for subclasses.
-    """
-
-    _schema_identity_report_registry: ClassVar[
-        dict[type[Self], report.SchemaIdentityInfo]
-    ] = {}
-    """
-    Cached schema identity reports for subclasses.
-    """
+                        # Descriptions inside sorted lists are always kept.
+                        stack.extend((x, False) for x in v if isinstance(x, dict))
+                        lists_to_sort.append((node, k, v))
+
+        for node, k, v in reversed(lists_to_sort):
+            # Most sorted lists (enums, literals, etc.) are already all strings.
+            if all(isinstance(x, str) for x in v):
+                v.sort()
+            else:
+                node[k] = sorted(map(str, v))
 
 
 # Class for most common usage:
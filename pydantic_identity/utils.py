@@ -1,6 +1,5 @@
 from typing import Any
 import sys
-import os
 from datetime import datetime, timezone
 from pathlib import Path
 import orjson
@@ -11,23 +10,15 @@ process_start_datetime = datetime.now(timezone.utc)
 
 def get_class_fullname(cls: type, *, path_parts: int = 2) -> str:
     """Class name that includes N path parts. i.e., with 2 parts: `foo.bar.MyCls`."""
-    path = get_filepath_cls_was_defined_in(cls) or ""
-    path = truncate_path(path, parts_to_keep=path_parts)
-    path = path.removesuffix(".py")
-    parts = [*Path(path).parts, cls.__name__]
+    parts: list[str] = []
+    if path_parts and (path := get_filepath_cls_was_defined_in(cls)):
+        parts = list(Path(path).parts[-path_parts:])
+        if parts and (stem := parts.pop().removesuffix(".py")) not in ("", "."):
+            parts.append(stem)
+    parts.append(cls.__name__)
     return ".".join(parts)
 
 
-def truncate_path(path: str, *, parts_to_keep: int) -> str:
-    """Remove all but the last N parts of a path."""
-    if not parts_to_keep:
-        return ""
-    parts = Path(path).parts[-parts_to_keep:]
-    if len(parts) == 0:
-        return ""
-    return os.path.join(*parts)
-
-
 def get_filepath_cls_was_defined_in(cls: type) -> str | None:
     """
     Returns None if the filepath can't be found, due to the object being created
@@ -40,6 +31,60 @@ def get_filepath_cls_was_defined_in(cls: type) -> str | None:
     return file
 
 
+def core_schema_has_aliases(schema: Any) -> bool:
+    """
+    Whether a Pydantic core schema declares a field alias anywhere, including in nested
+    models and definitions. Errs on the side of returning True.
+    Default values are dumped by alias too, so any default that isn't plain JSON data
+    (e.g. a model instance) counts as having aliases, and so does any default in a schema
+    with custom serializer functions, since those may turn a default into a model.
+    """
+    alias_keys = ("alias", "validation_alias", "serialization_alias")
+    has_default = has_ser_function = False
+    stack = [schema]
+    seen: set[int] = set()
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, dict):
+            if any(node.get(k) is not None for k in alias_keys):
+                return True
+            if node.get("type") == "default" and "default" in node:
+                if not is_plain_json_data(node["default"]):
+                    return True
+                has_default = True
+            if node.get("type") in ("function-plain", "function-wrap"):
+                has_ser_function = True
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(v for v in node if isinstance(v, (dict, list)))
+    return has_default and has_ser_function
+
+
+def is_plain_json_data(value: Any) -> bool:
+    """
+    Whether a value is made only of builtin JSON-like types (not subclasses), so it
+    serializes the same way regardless of any alias settings.
+    """
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        t = type(v)
+        if v is None or t in (str, int, float, bool):
+            continue
+        if t in (list, tuple, set, frozenset):
+            stack.extend(v)
+        elif t is dict:
+            if not all(type(k) is str for k in v):
+                return False
+            stack.extend(v.values())
+        else:
+            return False
+    return True
+
+
 def json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
     """Better JSON serialization"""
     opts = 0
@@ -49,5 +94,9 @@ def json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
 
 
 def json_loads(data: bytes) -> Any:
-    """Better JSON deserialization"""
+    """
+    Better JSON deserialization. When the target is a Pydantic model, such as
+    `SchemaIdentityInfo`, use its `model_validate_json()` instead, which parses and
+    validates in a single pass.
+    """
     return orjson.loads(data)
@@ -1,8 +1,9 @@
 # pyright: reportRedeclaration=false
 # pyright: reportInvalidTypeForm=false
-from typing import Literal
-from pydantic import ConfigDict, Field
+from typing import Annotated, Any, Literal
+from pydantic import ConfigDict, Field, PlainSerializer
 from pydantic_identity import BaseIdentityModel
+from pydantic_identity.main import _schema_hash_registry
 
 
 class BaseModel(BaseIdentityModel):
@@ -24,6 +25,7 @@ class BaseModel(BaseIdentityModel):
     model_schema_hash_limit_length = 12
     model_schema_hash_tracked_filepath_parts = 2
     model_schema_hash_track_validation_mode = True
+    model_schema_hash_eager = False
 
 
 def test_multi_inheritance():
@@ -283,6 +285,34 @@ def test_track_limit_length():
     )
 
 
+def test_hash_function_sha256():
+    from hashlib import sha256
+    from pydantic_identity.main import hash_sha256_hex
+
+    class Foo(BaseModel):
+        model_schema_hash_function = hash_sha256_hex
+        model_schema_hash_limit_length = None
+        a: int
+
+    data = Foo.model_schema_hash_get_input_data()
+    assert Foo.model_schema_hash_get() == sha256(data).hexdigest()
+
+
+def test_hash_function_blake3():
+    import pytest
+    from pydantic_identity.main import hash_blake3_hex
+
+    blake3 = pytest.importorskip("blake3").blake3
+
+    class Foo(BaseModel):
+        model_schema_hash_function = hash_blake3_hex
+        model_schema_hash_limit_length = None
+        a: int
+
+    data = Foo.model_schema_hash_get_input_data()
+    assert Foo.model_schema_hash_get() == blake3(data).hexdigest()
+
+
 def test_tracked_filepath_parts():
     class M0(BaseModel):
         model_schema_hash_tracked_filepath_parts = 0
@@ -310,3 +340,178 @@ def test_tracked_filepath_parts():
     assert len(names[1].split(".")) == 2
     assert len(names[2].split(".")) == 3
     assert len(names[3].split(".")) > len(names[2].split("."))
+
+
+def test_rebuild_clears_cached_input_data():
+    """
+    Hash input data is cached alongside the hash, so rebuilding must invalidate both.
+    """
+
+    class Foo(BaseModel):
+        a: int = 1
+
+    data = Foo.model_schema_hash_get_input_data()
+    assert Foo.model_schema_hash_get_input_data() is data
+
+    Foo.model_schema_hash_tracked_extra_data = "changed"
+    assert Foo.model_schema_hash_get_input_data() is data
+
+    Foo.model_schema_hash_rebuild()
+    assert Foo.model_schema_hash_get_input_data() != data
+
+
+def test_ser_by_name_schema_matches_pydantic():
+    """
+    The 'ser_by_name' schema is reused from 'ser_by_alias' when a model has no aliases.
+    It must always match what Pydantic would generate.
+    """
+    import json
+
+    class Inner(BaseModel):
+        x_y: int = Field(default=1, alias="xY")
+
+    class NoAliases(BaseModel):
+        a_b: int = 1
+
+    class NestedAlias(BaseModel):
+        a_b: int = 1
+        inner: Inner | None = None
+
+    # Defaults are dumped by alias, even when the field's type has no aliases.
+    class SubInner(NoAliases):
+        c_d: int = Field(default=2, alias="cD")
+
+    class AnyDefault(BaseModel):
+        x: Any = Inner()
+
+    class ObjectDefault(BaseModel):
+        x: object = Inner()
+
+    class NestedDefault(BaseModel):
+        x: dict = {"k": [Inner()]}
+
+    class SubclassDefault(BaseModel):
+        x: NoAliases = SubInner()
+
+    class SerializerDefault(BaseModel):
+        x: Annotated[int, PlainSerializer(lambda _: Inner())] = 1
+
+    models = [
+        NoAliases,
+        NestedAlias,
+        AnyDefault,
+        ObjectDefault,
+        NestedDefault,
+        SubclassDefault,
+        SerializerDefault,
+    ]
+    for model in models:
+        data = json.loads(model.model_schema_hash_create_input_data())
+        expected = model.model_json_schema(mode="serialization", by_alias=False)
+        model._preprocess_schemas(expected, False, False, False)
+        assert data["schemas"]["ser_by_name"] == expected
+
+
+def test_identity_report_round_trip():
+    from pydantic_identity import SchemaIdentityInfo
+
+    class Foo(BaseModel):
+        a: int = 1
+
+    info = Foo.model_schema_identity_report()
+    assert SchemaIdentityInfo.model_validate_json(info.model_dump_json()) == info
+
+
+def test_eager_hash():
+    """
+    Eager hashing computes the hash when the class is created, except for classes that
+    can't be fully built yet.
+    """
+
+    class Eager(BaseModel):
+        model_schema_hash_eager = True
+
+    class Foo(Eager):
+        a: int = 1
+
+    class Pending(Eager):
+        a: "Undefined | None" = None  # pyright: ignore[reportUndefinedVariable]
+
+    assert id(Foo) in _schema_hash_registry
+    assert id(Pending) not in _schema_hash_registry
+
+
+def test_eager_hash_errors_are_deferred():
+    """
+    If an eager hash fails to generate, class creation still succeeds, and the error is
+    raised when the hash is first accessed instead.
+    """
+    import pytest
+    from pydantic.errors import PydanticInvalidForJsonSchema
+
+    class Eager(BaseModel):
+        model_schema_hash_eager = True
+
+    class Override(Eager):
+        model_config = ConfigDict(json_schema_mode_override="validation")
+        a: int = 1
+
+    class Arbitrary:
+        pass
+
+    class NoJsonSchema(Eager):
+        model_config = ConfigDict(arbitrary_types_allowed=True)
+        a: Arbitrary | None = None
+
+    assert id(Override) not in _schema_hash_registry
+    assert id(NoJsonSchema) not in _schema_hash_registry
+
+    with pytest.raises(ValueError):
+        Override.model_schema_hash_get()
+    with pytest.raises(PydanticInvalidForJsonSchema):
+        NoJsonSchema.model_schema_hash_get()
+
+
+def test_registries_do_not_keep_classes_alive():
+    """
+    Cached values shouldn't prevent a model class from being garbage collected.
+    """
+    import gc
+    import weakref
+
+    def create() -> weakref.ref:
+        class Foo(BaseModel):
+            a: int = 1
+
+        Foo.model_schema_hash_get()
+        Foo.model_schema_identity_report()
+        return weakref.ref(Foo)
+
+    ref = create()
+    gc.collect()
+    assert ref() is None
+
+
+def test_create_new_ignores_cached_input_data():
+    """
+    Creating a new hash must use fresh input data, and must not touch the cache, so the
+    cached input data always matches the cached hash.
+    """
+
+    class Foo(BaseModel):
+        a: int = 1
+
+    def hash_of_cached_input_data() -> str:
+        data = Foo.model_schema_hash_get_input_data()
+        return Foo._create_hash_from_input_data(data)
+
+    old_hash = Foo.model_schema_hash_get()
+    Foo.model_schema_hash_tracked_extra_data = "changed"
+    new_hash = Foo.model_schema_hash_create_new()
+
+    assert new_hash != old_hash
+    assert Foo.model_schema_hash_get() == old_hash
+    assert hash_of_cached_input_data() == old_hash
+
+    assert Foo.model_schema_hash_rebuild() == new_hash
+    assert hash_of_cached_input_data() == new_hash